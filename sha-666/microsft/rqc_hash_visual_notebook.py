@@ -8,34 +8,38 @@ import matplotlib.pyplot as plt
 import numpy as np
 import math
 import argparse
+import functools
 
-def build_random_circuit(n_qubits, depth, seed):
+_TWO_PI = 2.0 * math.pi
+
+@functools.lru_cache(maxsize=None)
+def entangler_edges(n_qubits):
+    # same CX pattern in every layer: even pairs, odd pairs, wrap-around; computed once per n
+    edges = [(q, q+1) for q in range(0, n_qubits-1, 2)]
+    edges += [(q, q+1) for q in range(1, n_qubits-1, 2)]
+    if n_qubits > 2:
+        edges.append((n_qubits-1, 0))
+    return tuple(edges)
+
+def build_full_circuit(msg_bytes, n_qubits, depth, seed):
+    # single circuit built in place: message X gates, random layers, measurement (no compose copies)
     rng = np.random.default_rng(seed)
     qc = QuantumCircuit(n_qubits, n_qubits)
+    edges = entangler_edges(n_qubits)
+    # encode message (LSB-first per byte)
+    bits = np.unpackbits(np.frombuffer(msg_bytes, dtype=np.uint8), bitorder='little')[:n_qubits]
+    for i in np.flatnonzero(bits):
+        qc.x(int(i))
+    # one draw for all angles: [..., 0]=theta, [..., 1]=phi (same order as per-gate draws)
+    angles = (rng.random((depth, n_qubits, 2)) * _TWO_PI).tolist()
     for layer in range(depth):
         for q in range(n_qubits):
-            theta = float(rng.random() * 2 * math.pi)
-            phi = float(rng.random() * 2 * math.pi)
-            qc.rz(phi, q)
-            qc.rx(theta, q)
-        for q in range(0, n_qubits-1, 2):
-            qc.cx(q, q+1)
-        for q in range(1, n_qubits-1, 2):
-            qc.cx(q, q+1)
-        if n_qubits > 2:
-            qc.cx(n_qubits-1, 0)
-    return qc
-
-def encode_message(msg_bytes, n_qubits):
-    qc = QuantumCircuit(n_qubits, n_qubits)
-    bits = []
-    for b in msg_bytes:
-        for i in range(8):
-            bits.append((b >> i) & 1)
-    for i, bit in enumerate(bits):
-        if i >= n_qubits: break
-        if bit:
-            qc.x(i)
+            qc.rz(angles[layer][q][1], q)
+            qc.rx(angles[layer][q][0], q)
+        # plain CX gates (not a composite instruction) so the circuit drawing shows them
+        for ctrl, tgt in edges:
+            qc.cx(ctrl, tgt)
+    qc.measure(range(n_qubits), range(n_qubits))
     return qc
 
 def main():
@@ -45,17 +49,15 @@ def main():
     parser.add_argument("--d", type=int, default=8)
     parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--shots", type=int, default=1024)
+    # statevector (what automatic picks here) is fastest at these sizes; MPS only for many qubits, shallow depth
+    parser.add_argument("--aer-method", default="automatic",
+                        choices=["automatic", "statevector", "matrix_product_state"])
     args = parser.parse_args()
 
     msg = args.message.encode("utf-8")
     n = args.n; d = args.d; s = args.seed; shots = args.shots
 
-    enc = encode_message(msg, n)
-    rqc = build_random_circuit(n, d, s)
-    qc = QuantumCircuit(n, n)
-    qc.compose(enc, inplace=True)
-    qc.compose(rqc, inplace=True)
-    qc.measure(range(n), range(n))
+    qc = build_full_circuit(msg, n, d, s)
 
     # draw circuit to file
     drawer = circuit_drawer(qc, output='mpl', fold=100)
@@ -63,7 +65,9 @@ def main():
     print("Saved circuit diagram to /mnt/data/rqc_circuit.png")
 
     backend = Aer.get_backend("aer_simulator")
-    tqc = transpile(qc, backend, optimization_level=1)
+    backend.set_options(method=args.aer_method)
+    # simulator: no coupling constraints, so skip optimization passes
+    tqc = transpile(qc, backend, optimization_level=0, seed_transpiler=s)
     job = backend.run(tqc, shots=shots)
     result = job.result()
     counts = result.get_counts()